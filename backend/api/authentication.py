@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .versions import cache_is_shared
+
+TOKEN_KEY = 'auth_token:{digest}'
+INVALID_TOKEN = 'invalid'
+
+
+def token_cache_key(key):
+    return TOKEN_KEY.format(
+        digest=hashlib.sha256(key.encode()).hexdigest()
+    )
+
+
+def forget_tokens(*keys):
+    cache_keys = [token_cache_key(key) for key in keys]
+    if cache_keys:
+        cache.delete_many(cache_keys)
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def forget_user_tokens(*user_ids):
+    forget_tokens(*Token.objects.filter(
+        user_id__in=user_ids
+    ).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user = cache.get(cache_key)
+        if user == INVALID_TOKEN:
+            raise AuthenticationFailed('Недействительный токен.')
+        if user is None:
+            token = Token.objects.filter(key=key).select_related(
+                'user'
+            ).defer('user__recipes_count', 'user__followers_count').first()
+            if token is None:
+                cache.set(
+                    cache_key,
+                    INVALID_TOKEN,
+                    timeout=settings.AUTH_TOKEN_NEGATIVE_CACHE_TIMEOUT
+                )
+                raise AuthenticationFailed('Недействительный токен.')
+            user = token.user
+            if cache_is_shared():
+                cache.set(
+                    cache_key, user, timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT
+                )
+        if not user.is_active:
+            raise AuthenticationFailed('Пользователь неактивен.')
+        return user, Token(key=key, user=user)
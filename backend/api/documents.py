@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipe.models import Recipe
+from .versions import (bump_version, cache_is_shared, get_version,
+                       get_versions)
+
+RECIPE_DOCUMENTS_GENERATION_KEY = 'recipe_documents_generation'
+RECIPE_VERSION_KEY = 'recipe_version:{recipe_id}'
+RECIPE_DOCUMENT_KEY = 'recipe_document:{generation}:{version}:{host}:{id}'
+
+
+def bump_recipe_documents(*recipe_ids):
+    keys = [
+        RECIPE_VERSION_KEY.format(recipe_id=recipe_id)
+        for recipe_id in recipe_ids
+    ]
+    if keys:
+        transaction.on_commit(lambda: bump_version(*keys))
+
+
+def bump_author_documents(author_id):
+    bump_recipe_documents(*Recipe.objects.filter(
+        author_id=author_id
+    ).values_list('id', flat=True))
+
+
+def bump_all_recipe_documents():
+    transaction.on_commit(
+        lambda: bump_version(RECIPE_DOCUMENTS_GENERATION_KEY)
+    )
+
+
+def get_recipe_documents(recipe_ids, request, build):
+    if not settings.RECIPE_DOCUMENT_CACHE or not cache_is_shared():
+        return build(recipe_ids, request)
+    generation = get_version(RECIPE_DOCUMENTS_GENERATION_KEY)
+    versions = get_versions([
+        RECIPE_VERSION_KEY.format(recipe_id=recipe_id)
+        for recipe_id in recipe_ids
+    ])
+    keys = {
+        RECIPE_DOCUMENT_KEY.format(
+            generation=generation,
+            version=versions.get(
+                RECIPE_VERSION_KEY.format(recipe_id=recipe_id), 0
+            ),
+            host=request.build_absolute_uri('/'),
+            id=recipe_id
+        ): recipe_id
+        for recipe_id in recipe_ids
+    }
+    documents = {
+        keys[key]: document
+        for key, document in cache.get_many(keys).items()
+    }
+    missing = [
+        recipe_id for recipe_id in recipe_ids if recipe_id not in documents
+    ]
+    if missing:
+        built = build(missing, request)
+        cache.set_many(
+            {
+                key: built[recipe_id]
+                for key, recipe_id in keys.items() if recipe_id in built
+            },
+            timeout=settings.RECIPE_DOCUMENT_CACHE_TIMEOUT
+        )
+        documents.update(built)
+    return documents
@@ -0,0 +1,108 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from recipe.models import IngredientsInRecipe, Recipe, Tag
+from .documents import get_recipe_documents
+from .images import media_url, variant_urls
+from .memberships import get_memberships
+
+User = get_user_model()
+
+
+def recipe_tags(recipe_ids):
+    tags = defaultdict(list)
+    for recipe_id, tag_id, name, color, slug in Tag.objects.filter(
+        recipes__in=recipe_ids
+    ).values_list('recipes', 'id', 'name', 'color', 'slug'):
+        tags[recipe_id].append(
+            {'id': tag_id, 'name': name, 'color': color, 'slug': slug}
+        )
+    return tags
+
+
+def recipe_ingredients(recipe_ids):
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, name, unit, amount in (
+        IngredientsInRecipe.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list(
+            'recipe_id',
+            'ingredient_id',
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount'
+        )
+    ):
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount
+        })
+    return ingredients
+
+
+def recipe_authors(author_ids):
+    return {
+        author['id']: dict(author, is_subscribed=False)
+        for author in User.objects.filter(id__in=author_ids).values(
+            'id',
+            'email',
+            'username',
+            'first_name',
+            'last_name'
+        )
+    }
+
+
+def build_recipe_documents(recipe_ids, request):
+    rows = Recipe.objects.filter(id__in=recipe_ids).values(
+        'id',
+        'author_id',
+        'name',
+        'image',
+        'image_variants',
+        'text',
+        'cooking_time'
+    )
+    authors = recipe_authors({row['author_id'] for row in rows})
+    tags = recipe_tags(recipe_ids)
+    ingredients = recipe_ingredients(recipe_ids)
+    return {
+        row['id']: {
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': authors[row['author_id']],
+            'ingredients': ingredients[row['id']],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': row['name'],
+            'image': (
+                media_url(row['image'], request) if row['image'] else None
+            ),
+            'image_variants': variant_urls(row['image_variants'], request),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    }
+
+
+def serialize_recipe_page(recipes, request):
+    recipe_ids = [recipe.id for recipe in recipes]
+    documents = get_recipe_documents(
+        recipe_ids, request, build_recipe_documents
+    )
+    memberships = get_memberships(request)
+    page = []
+    for recipe_id in recipe_ids:
+        document = dict(documents[recipe_id])
+        author = document['author']
+        document['author'] = dict(
+            author, is_subscribed=author['id'] in memberships.following
+        )
+        document['is_favorited'] = recipe_id in memberships.favorites
+        document['is_in_shopping_cart'] = recipe_id in memberships.cart
+        page.append(document)
+    return page
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import FilterSet, filters
 
 from recipe.models import Ingredient, Recipe, Tag
+from .memberships import get_memberships
 
 User = get_user_model()
 
@@ -29,6 +31,12 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart',
     )
+    ordering = filters.OrderingFilter(
+        fields=(
+            ('publication_date', 'publication_date'),
+            ('favorites_count', 'popularity'),
+        )
+    )
 
     class Meta:
         model = Recipe
@@ -39,14 +47,25 @@ class RecipeFilter(FilterSet):
             'is_in_shopping_cart'
         ]
 
+    def filter_members(self, queryset, ids, relation):
+        if len(ids) > settings.MEMBERSHIPS_FILTER_MAX_IDS:
+            return queryset.filter(**{relation: self.request.user})
+        return queryset.filter(id__in=list(ids))
+
     def get_is_favorited(self, queryset, name, value):
-        user = self.request.user
-        if value and user.is_authenticated:
-            return queryset.filter(favorite_recipe__user=user)
+        if value and self.request.user.is_authenticated:
+            return self.filter_members(
+                queryset,
+                get_memberships(self.request).favorites,
+                'favorite_recipe__user'
+            )
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if value and user.is_authenticated:
-            return queryset.filter(recipe_shopping_cart__user=user)
+        if value and self.request.user.is_authenticated:
+            return self.filter_members(
+                queryset,
+                get_memberships(self.request).cart,
+                'recipe_shopping_cart__user'
+            )
         return queryset
@@ -0,0 +1,106 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from recipe.models import Recipe
+from .documents import bump_recipe_documents
+from .response_cache import bump_recipe_responses_for
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_VARIANTS_WORKERS,
+    thread_name_prefix='image-variants'
+)
+
+
+def variants_are_current(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants.get('source') == recipe.image.name
+    )
+
+
+def media_url(name, request=None):
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def variant_urls(image_variants, request=None):
+    return {
+        variant: {
+            extension: media_url(name, request)
+            for extension, name in files.items()
+        }
+        for variant, files in image_variants.get('variants', {}).items()
+    }
+
+
+def variant_name(source, variant, extension):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return f'{settings.IMAGE_VARIANTS_DIR}{stem}_{variant}.{extension}'
+
+
+def render_variant(image, width, image_format, options):
+    if image.width > width:
+        image = image.resize(
+            (width, round(image.height * width / image.width)),
+            Image.LANCZOS
+        )
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(recipe):
+    source = recipe.image.name
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGB')
+    variants = {}
+    for variant, width in settings.IMAGE_VARIANTS.items():
+        variants[variant] = {}
+        for extension, (image_format, options) in (
+            settings.IMAGE_VARIANT_FORMATS.items()
+        ):
+            name = variant_name(source, variant, extension)
+            variants[variant][extension] = default_storage.save(
+                name, render_variant(image, width, image_format, options)
+            )
+    Recipe.objects.filter(id=recipe.id, image=source).update(
+        image_variants={'source': source, 'variants': variants}
+    )
+    bump_recipe_documents(recipe.id)
+    bump_recipe_responses_for(recipe.id)
+    return variants
+
+
+def generate_variants_for(recipe_id):
+    try:
+        recipe = Recipe.objects.only('id', 'image').get(id=recipe_id)
+        if recipe.image:
+            generate_variants(recipe)
+    except Exception:
+        logger.exception('Не удалось подготовить фото рецепта %s', recipe_id)
+    finally:
+        if settings.IMAGE_VARIANTS_ASYNC:
+            connection.close()
+
+
+def schedule_variants(recipe):
+    if not recipe.image or variants_are_current(recipe):
+        return
+    if settings.IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(generate_variants_for, recipe.id)
+        )
+    else:
+        transaction.on_commit(lambda: generate_variants_for(recipe.id))
@@ -0,0 +1,41 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from api.search import ingredient_index
+from recipe.models import Ingredient
+
+
+class Command(BaseCommand):
+
+    help = 'Сравнивает поиск ингредиентов по префиксу через ORM и индекс'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'prefixes',
+            nargs='*',
+            default=['а', 'мо', 'сли', 'кар', 'соль', 'я'],
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        ingredient_index.refresh()
+        self.stdout.write(
+            f'{"префикс":<10}{"найдено":>10}{"ORM, мс":>12}{"индекс, мс":>14}'
+        )
+        for prefix in options['prefixes']:
+            def orm_search():
+                return list(Ingredient.objects.filter(
+                    name__istartswith=prefix
+                ).values('id', 'name', 'measurement_unit'))
+
+            def index_search():
+                return ingredient_index.search(prefix)
+
+            orm_time = timeit.timeit(orm_search, number=repeat) / repeat
+            index_time = timeit.timeit(index_search, number=repeat) / repeat
+            self.stdout.write(
+                f'{prefix:<10}{len(index_search()):>10}'
+                f'{orm_time * 1000:>12.3f}{index_time * 1000:>14.4f}'
+            )
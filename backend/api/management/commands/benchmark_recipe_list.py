@@ -0,0 +1,150 @@
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fastpath import serialize_recipe_page
+from api.serializers import RecipeReadSerializer
+from recipe.models import (Ingredient, IngredientsInRecipe, Recipe, Subscribe,
+                           Tag)
+
+User = get_user_model()
+
+
+def generate_recipes(count):
+    author = User.objects.create_user(
+        username='benchmark_author',
+        email='benchmark_author@example.com',
+        first_name='Benchmark',
+        last_name='Author'
+    )
+    if Tag.objects.count() < 3:
+        Tag.objects.bulk_create(
+            Tag(name=f'benchmark {i}', color='#000000', slug=f'benchmark-{i}')
+            for i in range(3)
+        )
+    if Ingredient.objects.count() < 10:
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'benchmark {i}', measurement_unit='г')
+            for i in range(10)
+        )
+    tags = Tag.objects.all()[:3]
+    ingredients = Ingredient.objects.all()[:10]
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=author,
+            name=f'Рецепт {i}',
+            image='recipe/image/1.jpg',
+            text='Описание рецепта ' * 20,
+            cooking_time=i % 120 + 1
+        )
+        for i in range(count)
+    )
+    recipes = Recipe.objects.filter(author=author)
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipes for tag in tags
+    )
+    IngredientsInRecipe.objects.bulk_create(
+        IngredientsInRecipe(recipe=recipe, ingredient=ingredient, amount=i)
+        for recipe in recipes
+        for i, ingredient in enumerate(ingredients, start=1)
+    )
+    return author
+
+
+class Command(BaseCommand):
+
+    help = 'Сравнивает сериализацию списка рецептов DRF и быстрым путём'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'page_sizes', nargs='*', type=int, default=[6, 50, 500]
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--generate',
+            type=int,
+            default=0,
+            help='Создать столько тестовых рецептов и откатить их после замера'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя, от имени которого читается список'
+        )
+
+    def make_request(self, user):
+        request = Request(APIRequestFactory().get(
+            '/api/recipes/', HTTP_HOST='localhost'
+        ))
+        request.user = user
+        return request
+
+    def measure(self, request, recipe_ids, repeat):
+        renderer = JSONRenderer()
+
+        def drf():
+            recipes = Recipe.objects.for_read(request.user).filter(
+                id__in=recipe_ids
+            )
+            return renderer.render(RecipeReadSerializer(
+                recipes, many=True, context={'request': request}
+            ).data)
+
+        def fast():
+            recipes = Recipe.objects.filter(id__in=recipe_ids).only('id')
+            return renderer.render(serialize_recipe_page(recipes, request))
+
+        if drf() != fast():
+            raise CommandError(
+                f'Ответы различаются на странице из {len(recipe_ids)}'
+            )
+        with override_settings(RECIPE_DOCUMENT_CACHE=False):
+            cold = timeit.timeit(fast, number=repeat) / repeat
+        return (
+            timeit.timeit(drf, number=repeat) / repeat,
+            cold,
+            timeit.timeit(fast, number=repeat) / repeat
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        author = None
+        if options['generate']:
+            author = generate_recipes(options['generate'])
+        if options['user'] is not None:
+            user = User.objects.get(id=options['user'])
+        elif author is not None:
+            user = User.objects.create_user(
+                username='benchmark_reader',
+                email='benchmark_reader@example.com'
+            )
+            Subscribe.objects.create(user=user, author=author)
+        else:
+            user = AnonymousUser()
+        request = self.make_request(user)
+        self.stdout.write(
+            f'{"рецептов":<10}{"DRF, мс":>12}{"быстро, мс":>14}'
+            f'{"с кэшем, мс":>14}{"ускорение":>12}'
+        )
+        for page_size in options['page_sizes']:
+            recipe_ids = list(Recipe.objects.values_list(
+                'id', flat=True
+            )[:page_size])
+            drf_time, fast_time, cached_time = self.measure(
+                request, recipe_ids, options['repeat']
+            )
+            self.stdout.write(
+                f'{len(recipe_ids):<10}{drf_time * 1000:>12.2f}'
+                f'{fast_time * 1000:>14.2f}{cached_time * 1000:>14.2f}'
+                f'{drf_time / fast_time:>11.1f}x'
+            )
+        if options['generate']:
+            transaction.set_rollback(True)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipe.models import Recipe
+
+
+def referenced_files():
+    referenced = set()
+    for image, variants in Recipe.objects.values_list(
+        'image', 'image_variants'
+    ).iterator():
+        referenced.add(image)
+        for files in variants.get('variants', {}).values():
+            referenced.update(files.values())
+    return referenced
+
+
+def stored_files(directory):
+    if not default_storage.exists(directory):
+        return
+    directories, files = default_storage.listdir(directory)
+    for name in files:
+        yield f'{directory.rstrip("/")}/{name}'
+    for subdirectory in directories:
+        yield from stored_files(f'{directory.rstrip("/")}/{subdirectory}')
+
+
+class Command(BaseCommand):
+
+    help = 'Удаляет файлы медиа, на которые не ссылается ни один рецепт'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, какие файлы будут удалены'
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=settings.MEDIA_GC_MIN_AGE,
+            help='Не трогать файлы моложе указанного числа секунд'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        referenced = referenced_files()
+        removed = freed = 0
+        for directory in (settings.IMAGE_DIR, settings.IMAGE_VARIANTS_DIR):
+            for name in stored_files(directory):
+                if (
+                    name in referenced
+                    or default_storage.get_modified_time(name) > cutoff
+                ):
+                    continue
+                removed += 1
+                freed += default_storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{action} файлов: {removed}, {freed // 1024} КБ'
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from api.images import generate_variants, variants_are_current
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+
+    help = 'Готовит уменьшенные копии фото для существующих рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии даже для актуальных рецептов'
+        )
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        recipes = Recipe.objects.exclude(image='').only(
+            'id', 'image', 'image_variants'
+        ).order_by('id')
+        for recipe in recipes.iterator():
+            if not options['force'] and variants_are_current(recipe):
+                continue
+            try:
+                generate_variants(recipe)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+                continue
+            generated += 1
+        self.stdout.write(
+            f'Подготовлено рецептов: {generated}, с ошибками: {failed}'
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.shopping_list import bump_cart_version
+from recipe.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+
+    help = 'Пересобирает и проверяет агрегированные списки покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить списки с корзинами, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        expected = ShoppingListItem.objects.aggregate_from_carts()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in
+            ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        mismatched = {
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        }
+        if options['verify']:
+            if mismatched:
+                raise CommandError(
+                    f'Расхождений в списках покупок: {len(mismatched)}'
+                )
+            self.stdout.write('Списки покупок совпадают с корзинами')
+            return
+        bump_cart_version(*ShoppingListItem.objects.rebuild())
+        self.stdout.write(
+            f'Списки покупок пересобраны, исправлено позиций: '
+            f'{len(mismatched)}'
+        )
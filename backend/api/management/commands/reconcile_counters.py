@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipe.models import FavoriteRecipe, Recipe, ShoppingCart, Subscribe
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'favorite_recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscribe, 'author'),
+)
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('id')).values('count')
+    ), 0)
+
+
+class Command(BaseCommand):
+
+    help = 'Сверяет и исправляет денормализованные счётчики'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только найти расхождения, ничего не меняя'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        drifted = 0
+        for model, counter, relation, field in COUNTERS:
+            rows = model.objects.annotate(
+                actual=count_of(relation, field)
+            ).exclude(**{counter: F('actual')})
+            ids = list(rows.values_list('id', flat=True))
+            drifted += len(ids)
+            if ids and not options['verify']:
+                model.objects.filter(id__in=ids).update(
+                    **{counter: count_of(relation, field)}
+                )
+        if options['verify']:
+            if drifted:
+                raise CommandError(f'Расхождений в счётчиках: {drifted}')
+            self.stdout.write('Счётчики совпадают с данными')
+            return
+        self.stdout.write(f'Счётчики сверены, исправлено: {drifted}')
@@ -1,23 +1,105 @@
 import csv
+import json
+import os
+from itertools import islice
 
-from django.core.management.base import BaseCommand
-from foodgram.settings import CSV_FILES_UP
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.reference import bump_reference_version
+from api.search import bump_ingredient_index_version
 from recipe.models import Ingredient
 
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) == 2:
+            yield row
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('JSON должен содержать список ингредиентов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON обрывается')
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        if not (
+            isinstance(item, dict)
+            and isinstance(item.get('name'), str)
+            and isinstance(item.get('measurement_unit'), str)
+        ):
+            raise CommandError(f'Некорректный ингредиент в JSON: {item!r}')
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
 
 class Command(BaseCommand):
 
+    help = 'Загружает ингредиенты из CSV или JSON пачками без дублей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(settings.CSV_FILES_UP, 'ingredients.csv')
+        )
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Посчитать новые ингредиенты, ничего не сохраняя'
+        )
+
     def handle(self, *args, **options):
-        with open(
-                f'{CSV_FILES_UP}/ingredients.csv',
-                encoding='utf-8'
-        ) as file:
-            reader = csv.reader(file)
-            for item in reader:
-                name, unit = item
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=unit
-                )
-
-        print('Добавлены ингредиенты', Ingredient.objects.count())
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        total = 0
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            count_before = Ingredient.objects.count()
+            rows = (
+                Ingredient(name=name.strip(), measurement_unit=unit.strip())
+                for name, unit in READERS[file_format](file)
+            )
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                total += len(batch)
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+            inserted = Ingredient.objects.count() - count_before
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        if inserted and not options['dry_run']:
+            bump_ingredient_index_version()
+            bump_reference_version()
+        self.stdout.write(
+            f'Добавлено ингредиентов: {inserted}, '
+            f'пропущено: {total - inserted}'
+            + (' (пробный запуск)' if options['dry_run'] else '')
+        )
@@ -0,0 +1,92 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipe.models import FavoriteRecipe, ShoppingCart, Subscribe
+from .versions import bump_version, cache_is_shared, get_version
+
+MEMBERSHIPS_VERSION_KEY = 'memberships_version:{user_id}'
+MEMBERSHIPS_KEY = 'memberships:{user_id}:{version}'
+
+
+class IdSet:
+
+    def __init__(self, blob=b''):
+        self.ids = array('q')
+        self.ids.frombytes(blob)
+
+    @staticmethod
+    def pack(ids):
+        return array('q', sorted(ids)).tobytes()
+
+    def __contains__(self, value):
+        index = bisect_left(self.ids, value)
+        return index < len(self.ids) and self.ids[index] == value
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class Memberships:
+
+    def __init__(self, favorites=b'', cart=b'', following=b''):
+        self.favorites = IdSet(favorites)
+        self.cart = IdSet(cart)
+        self.following = IdSet(following)
+
+
+def bump_memberships(*user_ids):
+    keys = [
+        MEMBERSHIPS_VERSION_KEY.format(user_id=user_id)
+        for user_id in user_ids
+    ]
+    if keys:
+        transaction.on_commit(lambda: bump_version(*keys))
+
+
+def build_memberships(user_id):
+    return (
+        IdSet.pack(FavoriteRecipe.objects.filter(
+            user_id=user_id
+        ).values_list('favorite_recipe_id', flat=True)),
+        IdSet.pack(ShoppingCart.objects.filter(
+            user_id=user_id
+        ).values_list('recipe_id', flat=True)),
+        IdSet.pack(Subscribe.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)),
+    )
+
+
+def load_memberships(user_id):
+    if not cache_is_shared():
+        return Memberships(*build_memberships(user_id))
+    key = MEMBERSHIPS_KEY.format(
+        user_id=user_id,
+        version=get_version(
+            MEMBERSHIPS_VERSION_KEY.format(user_id=user_id)
+        )
+    )
+    blobs = cache.get(key)
+    if blobs is None:
+        blobs = build_memberships(user_id)
+        cache.set(key, blobs, timeout=settings.MEMBERSHIPS_CACHE_TIMEOUT)
+    return Memberships(*blobs)
+
+
+def get_memberships(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Memberships()
+    http_request = getattr(request, '_request', request)
+    memberships = getattr(http_request, '_memberships', None)
+    if memberships is None or memberships[0] != user.id:
+        memberships = (user.id, load_memberships(user.id))
+        http_request._memberships = memberships
+    return memberships[1]
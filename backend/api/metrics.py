@@ -0,0 +1,93 @@
+import os
+from time import perf_counter
+
+from prometheus_client import (REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest, multiprocess)
+
+LABELS = ('view', 'method')
+
+REQUESTS = Counter(
+    'api_requests_total',
+    'Запросы к API',
+    LABELS + ('status',)
+)
+LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'Время обработки запроса',
+    LABELS
+)
+QUERIES = Histogram(
+    'api_request_db_queries',
+    'SQL-запросов на запрос',
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float('inf'))
+)
+QUERY_TIME = Histogram(
+    'api_request_db_duration_seconds',
+    'Время SQL-запросов на запрос',
+    LABELS
+)
+RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes',
+    'Размер ответа',
+    LABELS,
+    buckets=(
+        256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+        float('inf')
+    )
+)
+
+
+class QueryStats:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += perf_counter() - start
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name
+    action = (getattr(match.func, 'actions', None) or {}).get(
+        request.method.lower()
+    )
+    if action is None:
+        return view_class.__name__
+    return f'{view_class.__name__}.{action}'
+
+
+def observe(request, response, duration, stats):
+    labels = (view_label(request), request.method)
+    REQUESTS.labels(*labels, response.status_code).inc()
+    LATENCY.labels(*labels).observe(duration)
+    QUERIES.labels(*labels).observe(stats.count)
+    QUERY_TIME.labels(*labels).observe(stats.duration)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+
+
+def server_timing(duration, stats):
+    return (
+        f'app;dur={duration * 1000:.1f}, '
+        f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+    )
+
+
+def export_metrics():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,137 @@
+import re
+import zlib
+from contextlib import ExitStack
+from time import perf_counter
+
+import brotli
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from .metrics import QueryStats, observe, server_timing
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?')
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in header.split(','):
+        match = ACCEPT_ENCODING_RE.match(part)
+        if match is None:
+            continue
+        encoding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(encoding.lower())
+    return encodings
+
+
+class BrotliStream:
+
+    encoding = 'br'
+
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class GzipStream:
+
+    encoding = 'gzip'
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def compress_stream(stream, chunks):
+    for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.finish()
+
+
+class CompressionMiddleware:
+
+    streams = (BrotliStream, GzipStream)
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encodings = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        for stream_class in self.streams:
+            if stream_class.encoding in encodings:
+                break
+        else:
+            return response
+        stream = stream_class()
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                stream, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            compressed = stream.compress(response.content) + stream.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        response['Content-Encoding'] = stream.encoding
+        return response
+
+    def is_compressible(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.has_header('Content-Encoding')
+        ):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if not content_type.startswith(settings.COMPRESSIBLE_CONTENT_TYPES):
+            return False
+        return response.streaming or (
+            len(response.content) >= settings.COMPRESSION_MIN_SIZE
+        )
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        duration = perf_counter() - start
+        observe(request, response, duration, stats)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = server_timing(duration, stats)
+        return response
@@ -1,7 +1,84 @@
-from rest_framework import mixins, viewsets
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from foodgram.counters import change_counter
+from .memberships import bump_memberships
 
 
 class CreateDestroyViewSet(mixins.CreateModelMixin,
                            mixins.DestroyModelMixin,
                            viewsets.GenericViewSet):
     pass
+
+
+class UniqueCreateMixin:
+
+    duplicate_message = None
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [self.duplicate_message]
+            })
+
+
+class UserRelationMixin:
+
+    target_model = None
+    target_field = None
+    target_kwarg = None
+    missing_message = None
+    check_target_on_delete = False
+
+    counter_field = None
+
+    def update_counter(self, target_id, delta):
+        if self.counter_field is not None:
+            change_counter(
+                self.target_model.objects.filter(id=target_id),
+                self.counter_field,
+                delta
+            )
+
+    def relation_added(self, target_id):
+        self.update_counter(target_id, 1)
+        bump_memberships(self.request.user.id)
+
+    def relation_removed(self, target_id):
+        self.update_counter(target_id, -1)
+        bump_memberships(self.request.user.id)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        target = get_object_or_404(
+            self.target_model,
+            id=self.kwargs.get(self.target_kwarg)
+        )
+        serializer.save(user=self.request.user, **{self.target_field: target})
+        self.relation_added(target.id)
+
+    @transaction.atomic
+    def remove_relation(self, target_id):
+        deleted, _ = self.get_queryset().filter(
+            **{f'{self.target_field}_id': target_id}
+        ).delete()
+        if deleted:
+            self.relation_removed(target_id)
+        return deleted
+
+    def delete(self, request, *args, **kwargs):
+        target_id = kwargs[self.target_kwarg]
+        if not self.remove_relation(target_id):
+            if self.check_target_on_delete:
+                get_object_or_404(self.target_model, id=target_id)
+            return Response(
+                self.missing_message,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
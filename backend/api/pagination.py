@@ -0,0 +1,125 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-publication_date', '-id')
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values, strict=True)
+            ]
+        except (BinasciiError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        values = [
+            getattr(instance, field.lstrip('-')) for field in self.ordering
+        ]
+        return urlsafe_b64encode(json.dumps(
+            [getattr(value, 'isoformat', lambda: value)() for value in values]
+        ).encode()).decode()
+
+    def position_filter(self, position):
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(
+                **{
+                    other.lstrip('-'): value
+                    for other, value in zip(self.ordering[:index], position)
+                },
+                **{f'{name}__{lookup}': position[index]}
+            )
+        leading = self.ordering[0]
+        bound = 'lte' if leading.startswith('-') else 'gte'
+        return condition & Q(
+            **{f'{leading.lstrip("-")}__{bound}': position[0]}
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset.model)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position))
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = (
+            self.encode_cursor(page[page_size - 1])
+            if len(page) > page_size else None
+        )
+        return page[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_pagination_class.cursor_query_param in (
+            request.query_params
+        ):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SubscriptionKeysetPagination(KeysetPagination):
+
+    ordering = ('-follow_date', '-id')
+
+
+class SubscriptionPagination(PageNumberOrKeysetPagination):
+
+    keyset_pagination_class = SubscriptionKeysetPagination
@@ -0,0 +1,88 @@
+import json
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.datastructures import MultiValueDict
+from PIL import Image, UnidentifiedImageError
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError, ValidationError
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+
+    header_limit = 256 * 1024
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > settings.RECIPE_IMAGE_MAX_SIZE + self.chunk_size:
+            self.reject_size()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.reject_size()
+        if self.header is not None:
+            self.check_header(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, raw_data):
+        self.header += raw_data
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                width, height = image.size
+        except (UnidentifiedImageError, OSError):
+            if len(self.header) >= self.header_limit:
+                self.reject('Загрузите корректное изображение')
+            return
+        except Image.DecompressionBombError:
+            width = height = None
+        self.header = None
+        side = settings.RECIPE_IMAGE_MAX_SIDE
+        if width is None or width > side or height > side:
+            self.reject(
+                f'Размер фото не должен превышать {side}x{side} пикселей'
+            )
+
+    def file_complete(self, file_size):
+        if self.header is not None:
+            self.reject('Загрузите корректное изображение')
+        return super().file_complete(file_size)
+
+    def reject_size(self):
+        self.reject('Размер фото не должен превышать {} МБ'.format(
+            settings.RECIPE_IMAGE_MAX_SIZE // 1024 // 1024
+        ))
+
+    def reject(self, message):
+        raise ValidationError({'image': [message]})
+
+
+class UploadedFiles(MultiValueDict):
+
+    # Overriding iteration makes dict.update() merge the last value of each
+    # key instead of the raw lists, as QueryDict.update() does.
+    def __iter__(self):
+        return super().__iter__()
+
+
+class MultiPartJSONParser(parsers.MultiPartParser):
+
+    json_field = 'data'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = [ImageUploadHandler(request._request)]
+        result = super().parse(stream, media_type, parser_context)
+        if self.json_field not in result.data:
+            return result
+        try:
+            data = json.loads(result.data[self.json_field])
+        except ValueError as error:
+            raise ParseError(f'Поле {self.json_field} не JSON: {error}')
+        return parsers.DataAndFiles(data, UploadedFiles(result.files.lists()))
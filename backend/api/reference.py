@@ -0,0 +1,52 @@
+import gzip
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipe.models import Ingredient, Tag
+from .serializers import IngredientSerializer, TagSerializer
+from .versions import bump_version, cache_is_shared, get_version
+
+REFERENCE_VERSION_KEY = 'reference_data_version'
+REFERENCE_BUNDLE_KEY = 'reference_data:{version}'
+
+
+def bump_reference_version():
+    transaction.on_commit(lambda: bump_version(REFERENCE_VERSION_KEY))
+
+
+def build_reference_bundle():
+    content = json.dumps(
+        {
+            'tags': TagSerializer(Tag.objects.all(), many=True).data,
+            'ingredients': IngredientSerializer(
+                Ingredient.objects.order_by('id'), many=True
+            ).data,
+        },
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode()
+    return {
+        'etag': f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+        'content': content,
+        'gzip': gzip.compress(content, compresslevel=9),
+    }
+
+
+def get_reference_bundle():
+    key = REFERENCE_BUNDLE_KEY.format(
+        version=get_version(REFERENCE_VERSION_KEY)
+    )
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build_reference_bundle()
+        cache.set(
+            key,
+            bundle,
+            timeout=None if cache_is_shared()
+            else settings.REFERENCE_BUNDLE_MAX_AGE
+        )
+    return bundle
@@ -0,0 +1,69 @@
+import msgpack
+import orjson
+from django.http import Http404
+from rest_framework import renderers
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.utils.encoders import JSONEncoder
+
+encoder = JSONEncoder()
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(
+            data,
+            default=encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encoder.default)
+
+
+class PlainTextRenderer(renderers.BaseRenderer):
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(PlainTextRenderer):
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class FormatContentNegotiation(BaseContentNegotiation):
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        export_format = format_suffix or request.query_params.get('format')
+        if not export_format:
+            return renderers[0], renderers[0].media_type
+        for renderer in renderers:
+            if renderer.format == export_format:
+                return renderer, renderer.media_type
+        raise Http404
@@ -0,0 +1,138 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.validators import slug_re
+from django.db import transaction
+from rest_framework.response import Response
+
+from recipe.models import Recipe, Tag
+from .documents import RECIPE_DOCUMENTS_GENERATION_KEY, RECIPE_VERSION_KEY
+from .versions import bump_version, get_versions
+
+RECIPE_RESPONSES_GENERATION_KEY = 'recipe_responses_generation'
+RECIPE_LIST_GENERATION_KEY = 'recipe_list_generation'
+AUTHOR_LIST_GENERATION_KEY = 'recipe_list_author:{author_id}'
+TAG_LIST_GENERATION_KEY = 'recipe_list_tag:{slug}'
+RECIPE_RESPONSE_KEY = 'recipe_response:{digest}'
+RECIPE_RESPONSE_LOCK_KEY = 'recipe_response_lock:{digest}'
+
+
+def bump_recipe_responses(author_ids=(), tag_slugs=()):
+    keys = [RECIPE_LIST_GENERATION_KEY]
+    keys += [
+        AUTHOR_LIST_GENERATION_KEY.format(author_id=author_id)
+        for author_id in author_ids
+    ]
+    keys += [TAG_LIST_GENERATION_KEY.format(slug=slug) for slug in tag_slugs]
+    transaction.on_commit(lambda: bump_version(*keys))
+
+
+def bump_recipe_responses_for(*recipe_ids):
+    bump_recipe_responses(
+        set(Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('author_id', flat=True)),
+        set(Tag.objects.filter(
+            recipes__in=recipe_ids
+        ).values_list('slug', flat=True))
+    )
+
+
+def bump_all_recipe_responses():
+    transaction.on_commit(
+        lambda: bump_version(RECIPE_RESPONSES_GENERATION_KEY)
+    )
+
+
+def list_generation_keys(query_params):
+    author = query_params.get('author')
+    if author:
+        if not author.isdigit():
+            return None
+        return [AUTHOR_LIST_GENERATION_KEY.format(author_id=author)]
+    tags = [slug for slug in query_params.getlist('tags') if slug]
+    if tags:
+        if not all(slug_re.match(slug) for slug in tags):
+            return None
+        return [TAG_LIST_GENERATION_KEY.format(slug=slug) for slug in tags]
+    return [RECIPE_LIST_GENERATION_KEY]
+
+
+def detail_generation_keys(recipe_id):
+    if not recipe_id.isdigit():
+        return None
+    return [
+        RECIPE_DOCUMENTS_GENERATION_KEY,
+        RECIPE_VERSION_KEY.format(recipe_id=recipe_id)
+    ]
+
+
+def normalized_params(query_params, allowed_params):
+    params = []
+    for name in sorted(query_params):
+        if name not in allowed_params:
+            return None
+        values = sorted(value for value in query_params.getlist(name) if value)
+        if values:
+            params.append((name, values))
+    return params
+
+
+def response_digest(request, params, generation_keys):
+    versions = get_versions(
+        [RECIPE_RESPONSES_GENERATION_KEY, *generation_keys]
+    )
+    return hashlib.sha256(repr((
+        request.build_absolute_uri(request.path),
+        params,
+        sorted(versions.items())
+    )).encode()).hexdigest()
+
+
+def wait_for_response(key):
+    deadline = time.monotonic() + settings.RECIPE_RESPONSE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.RECIPE_RESPONSE_LOCK_POLL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return None
+
+
+def cached_recipe_response(request, generation_keys, allowed_params,
+                           compute):
+    if (
+        not settings.RECIPE_RESPONSE_CACHE
+        or request.user.is_authenticated
+        or generation_keys is None
+    ):
+        return compute()
+    params = normalized_params(request.query_params, allowed_params)
+    if params is None:
+        return compute()
+    digest = response_digest(request, params, generation_keys)
+    key = RECIPE_RESPONSE_KEY.format(digest=digest)
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+    lock = RECIPE_RESPONSE_LOCK_KEY.format(digest=digest)
+    if not cache.add(
+        lock, 1, timeout=settings.RECIPE_RESPONSE_LOCK_TIMEOUT
+    ):
+        data = wait_for_response(key)
+        if data is not None:
+            return Response(data)
+        return compute()
+    try:
+        response = compute()
+        if response.status_code == 200:
+            cache.set(
+                key,
+                response.data,
+                timeout=settings.RECIPE_RESPONSE_CACHE_TIMEOUT
+            )
+    finally:
+        cache.delete(lock)
+    return response
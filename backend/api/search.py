@@ -0,0 +1,160 @@
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from recipe.models import Ingredient
+from .versions import bump_version, get_version
+
+INGREDIENT_INDEX_VERSION_KEY = 'ingredient_index_version'
+
+
+def get_ingredient_index_version():
+    return get_version(INGREDIENT_INDEX_VERSION_KEY)
+
+
+def bump_ingredient_index_version():
+    transaction.on_commit(
+        lambda: bump_version(INGREDIENT_INDEX_VERSION_KEY)
+    )
+
+
+class IngredientPrefixIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = ([], [])
+        self._version = None
+        self._loaded_at = 0
+
+    def _is_stale(self, version):
+        return (
+            version != self._version
+            or time.monotonic() - self._loaded_at
+            > settings.INGREDIENT_INDEX_MAX_AGE
+        )
+
+    def _load(self, version):
+        entries = sorted(
+            (name.casefold(), ingredient_id, name, unit)
+            for ingredient_id, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).iterator()
+        )
+        self._index = (
+            [entry[0] for entry in entries],
+            [
+                {'id': ingredient_id, 'name': name, 'measurement_unit': unit}
+                for _, ingredient_id, name, unit in entries
+            ]
+        )
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def refresh(self):
+        version = get_ingredient_index_version()
+        if self._is_stale(version):
+            with self._lock:
+                if self._is_stale(version):
+                    self._load(version)
+
+    def search(self, prefix):
+        self.refresh()
+        keys, rows = self._index
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + chr(sys.maxunicode), start)
+        return rows[start:end]
+
+
+ingredient_index = IngredientPrefixIndex()
+
+
+def _trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _escape_like(value):
+    return (
+        value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+
+
+def _postgresql_search(term, limit):
+    contains = f'%{_escape_like(term)}%'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT id, name, measurement_unit FROM recipe_ingredient '
+            'WHERE name ILIKE %s OR %s <%% name '
+            'ORDER BY name ILIKE %s DESC, name ILIKE %s DESC, '
+            'word_similarity(%s, name) DESC, name '
+            'LIMIT %s',
+            [contains, term, f'{_escape_like(term)}%', contains, term, limit]
+        )
+        return [
+            {'id': ingredient_id, 'name': name, 'measurement_unit': unit}
+            for ingredient_id, name, unit in cursor.fetchall()
+        ]
+
+
+def _sqlite_candidates(term, limit):
+    query = ' OR '.join(
+        '"{}"'.format(trigram.replace('"', '""'))
+        for trigram in _trigrams(term)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT i.id, i.name, i.measurement_unit '
+            'FROM recipe_ingredient_fts f '
+            'JOIN recipe_ingredient i ON i.id = f.rowid '
+            'WHERE recipe_ingredient_fts MATCH %s '
+            'ORDER BY f.rank LIMIT %s',
+            [query, limit]
+        )
+        return cursor.fetchall()
+
+
+def _orm_candidates(term, limit):
+    return Ingredient.objects.filter(name__icontains=term).values_list(
+        'id', 'name', 'measurement_unit'
+    )[:limit]
+
+
+def _rank(term, candidates, limit):
+    term = term.casefold()
+    term_trigrams = _trigrams(term)
+    ranked = []
+    for ingredient_id, name, unit in candidates:
+        key = name.casefold()
+        similarity = (
+            len(term_trigrams & _trigrams(key)) / len(term_trigrams)
+        )
+        if key.startswith(term):
+            tier = 0
+        elif term in key:
+            tier = 1
+        elif similarity >= settings.INGREDIENT_SEARCH_MIN_SIMILARITY:
+            tier = 2
+        else:
+            continue
+        ranked.append((tier, -similarity, key, {
+            'id': ingredient_id, 'name': name, 'measurement_unit': unit
+        }))
+    ranked.sort(key=lambda entry: entry[:3])
+    return [entry[3] for entry in ranked[:limit]]
+
+
+def ranked_ingredient_search(term, limit=None):
+    limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+    term = term.strip()
+    if len(term) < 3:
+        return ingredient_index.search(term)[:limit]
+    if connection.vendor == 'postgresql':
+        return _postgresql_search(term, limit)
+    pool = limit * settings.INGREDIENT_SEARCH_POOL_FACTOR
+    if connection.vendor == 'sqlite':
+        return _rank(term, _sqlite_candidates(term, pool), limit)
+    return _rank(term, _orm_candidates(term, pool), limit)
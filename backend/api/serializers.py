@@ -1,13 +1,21 @@
+from collections import Counter
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from djoser.serializers import (PasswordSerializer, UserCreateSerializer,
                                 UserSerializer)
 from django.contrib.auth.hashers import check_password
+from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import MinValueValidator
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 
 from recipe.models import (FavoriteRecipe, Ingredient, IngredientsInRecipe,
-                           Recipe, ShoppingCart, Subscribe, Tag)
+                           Recipe, ShoppingCart, ShoppingListItem, Subscribe,
+                           Tag)
+from .images import variant_urls
+from .memberships import get_memberships
+from .mixins import UniqueCreateMixin
 
 
 User = get_user_model()
@@ -29,10 +37,11 @@ class UserListSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        return (self.context.get('request').user.is_authenticated
-                and Subscribe.objects.filter(
-                    user=self.context.get('request').user,
-                    author=obj).exists())
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in get_memberships(
+            self.context.get('request')
+        ).following
 
 
 class UserCreateSerializer(UserCreateSerializer):
@@ -77,6 +86,20 @@ class IngrediendInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+
+    def to_representation(self, value):
+        return variant_urls(value, self.context.get('request'))
+
+
+class RecipeImageField(Base64ImageField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return serializers.ImageField.to_internal_value(self, data)
+        return super().to_internal_value(data)
+
+
 class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -98,8 +121,13 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     author = UserListSerializer(
         read_only=True,
     )
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(
+        read_only=True
+    )
+    is_in_shopping_cart = serializers.BooleanField(
+        read_only=True
+    )
+    image_variants = ImageVariantsField()
     cooking_time = serializers.IntegerField(
         required=True,
         validators=[MinValueValidator(1)]
@@ -116,24 +144,11 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time'
         )
 
-    def get_is_favorited(self, obj):
-        return (self.context.get('request').user.is_authenticated
-                and FavoriteRecipe.objects.filter(
-                    user=self.context.get('request').user,
-                    favorite_recipe=obj
-        ).exists())
-
-    def get_is_in_shopping_cart(self, obj):
-        return (self.context.get('request').user.is_authenticated
-                and ShoppingCart.objects.filter(
-                    user=self.context.get('request').user,
-                    recipe=obj
-        ).exists())
-
 
 class IngredientsEditSerializer(serializers.ModelSerializer):
 
@@ -147,7 +162,7 @@ class IngredientsEditSerializer(serializers.ModelSerializer):
 
 class RecipeEditSerializer(serializers.ModelSerializer):
 
-    image = Base64ImageField(
+    image = RecipeImageField(
         max_length=None,
         use_url=True
     )
@@ -161,6 +176,9 @@ class RecipeEditSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = '__all__'
+        read_only_fields = (
+            'favorites_count', 'in_carts_count', 'image_variants'
+        )
 
     def validate_name(self, name):
         if len(name) < 4:
@@ -174,23 +192,22 @@ class RecipeEditSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Ингредиентов нет'
             )
+        ingredient_ids = [ingredient['id'] for ingredient in ingredients]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты не должны повторяться'
+            )
         for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if not Ingredient.objects.filter(
-                id=ingredient['id']
-            ).exists():
-                raise serializers.ValidationError(
-                    'Такого ингредиента нет'
-                )
-            if ingredient_id in ingredients:
-                raise serializers.ValidationError(
-                    'Ингредиенты не должны повторяться'
-                )
-            amounts = ingredient['amount']
-            if not int(amounts) > 0:
+            if not int(ingredient['amount']) > 0:
                 raise serializers.ValidationError(
                     'Нужен как минимум 1 ингредиент'
                 )
+        if Ingredient.objects.filter(
+            id__in=ingredient_ids
+        ).count() != len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Такого ингредиента нет'
+            )
         return ingredients
 
     def validate_tags(self, tags):
@@ -212,15 +229,47 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         return cooking_time
 
     def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientsInRecipe.objects.bulk_create([
-                IngredientsInRecipe(
-                    recipe=recipe,
-                    ingredient_id=ingredient.get('id'),
-                    amount=ingredient.get('amount')
-                )
-            ])
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient['id'],
+                amount=ingredient['amount']
+            )
+            for ingredient in ingredients
+        )
 
+    def update_ingredients(self, ingredients, recipe):
+        new_amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        old_amounts = Counter()
+        to_update, to_delete = [], []
+        for item in recipe.recipe.all():
+            if (item.ingredient_id not in new_amounts
+                    or item.ingredient_id in old_amounts):
+                to_delete.append(item.id)
+            elif item.amount != new_amounts[item.ingredient_id]:
+                to_update.append(item)
+            old_amounts[item.ingredient_id] += item.amount
+        for item in to_update:
+            item.amount = new_amounts[item.ingredient_id]
+        if to_delete:
+            IngredientsInRecipe.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            IngredientsInRecipe.objects.bulk_update(to_update, ('amount',))
+        self.create_ingredients(
+            (
+                ingredient for ingredient in ingredients
+                if ingredient['id'] not in old_amounts
+            ),
+            recipe
+        )
+        ShoppingListItem.objects.change_recipe(
+            recipe.id, old_amounts, new_amounts
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -229,24 +278,27 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'ingredients' in validated_data:
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredients(ingredients, instance)
+            self.update_ingredients(
+                validated_data.pop('ingredients'), instance
+            )
         if 'tags' in validated_data:
             instance.tags.set(
                 validated_data.pop('tags')
             )
-        return super().update(
-            instance, validated_data
-        )
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data) or None)
+        return instance
 
     def to_representation(self, instance):
+        request = self.context.get('request')
         return RecipeReadSerializer(
-            instance,
+            Recipe.objects.for_read(request.user).get(pk=instance.pk),
             context={
-                'request': self.context.get('request')
+                'request': request
             }
         ).data
 
@@ -280,12 +332,16 @@ class SetPasswordSerializer(PasswordSerializer):
 
 class SubscribeRecipeSerializer(serializers.ModelSerializer):
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+class SubscribeSerializer(UniqueCreateMixin, serializers.ModelSerializer):
+
+    duplicate_message = 'Подписка уже оформлена'
 
     email = serializers.CharField(
         source='author.email',
@@ -308,9 +364,9 @@ class SubscribeSerializer(serializers.ModelSerializer):
         read_only=True
     )
     recipes = serializers.SerializerMethodField()
-    is_subscribe = serializers.SerializerMethodField()
+    is_subscribed = serializers.SerializerMethodField()
     recipes_count = serializers.ReadOnlyField(
-        source='author.recipe.count'
+        source='author.recipes_count'
     )
 
     class Meta:
@@ -321,7 +377,7 @@ class SubscribeSerializer(serializers.ModelSerializer):
             'username',
             'first_name',
             'last_name',
-            'is_subscribe',
+            'is_subscribed',
             'recipes',
             'recipes_count'
         )
@@ -333,30 +389,29 @@ class SubscribeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Нельзя подписаться на себя'
             )
-        if Subscribe.objects.filter(user=user, author=author).exists():
-            raise serializers.ValidationError(
-                'Подписка уже оформлена'
-            )
         return data
 
     def get_recipes(self, obj):
-        recipes = obj.author.recipe.all()
+        if hasattr(obj.author, 'limited_recipes'):
+            recipes = obj.author.limited_recipes
+        else:
+            recipes = obj.author.recipe.all()[:self.context.get(
+                'recipes_limit'
+            )]
         return SubscribeRecipeSerializer(
             recipes,
-            many=True
+            many=True,
+            context=self.context
         ).data
 
-    def get_is_subscribe(self, obj):
-        subscribe = Subscribe.objects.filter(
-            user=self.context.get('request').user,
-            author=obj.author
-        )
-        if subscribe:
-            return True
-        return False
+    def get_is_subscribed(self, obj):
+        return True
 
 
-class FavoriteRecipeSerializer(serializers.ModelSerializer):
+class FavoriteRecipeSerializer(UniqueCreateMixin,
+                               serializers.ModelSerializer):
+
+    duplicate_message = 'Этот рецепт уже в избранном'
 
     id = serializers.ReadOnlyField(
         source='favorite_recipe.id',
@@ -376,20 +431,11 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
         model = FavoriteRecipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe = self.context.get('recipe_id')
-        if FavoriteRecipe.objects.filter(
-            user=user,
-            favorite_recipe=recipe
-        ).exists():
-            raise serializers.ValidationError(
-                'Этот рецепт уже в избранном'
-            )
-        return data
 
+class ShoppingCartSerializer(UniqueCreateMixin,
+                             serializers.ModelSerializer):
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
+    duplicate_message = 'Рецепт уже добавлен в списке покупок'
 
     id = serializers.ReadOnlyField(
         source='recipe.id',
@@ -408,15 +454,3 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingCart
         fields = ('id', 'name', 'image', 'cooking_time')
-
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe = self.context.get('recipe_id')
-        if ShoppingCart.objects.filter(
-            user=user,
-            recipe=recipe
-        ).exists():
-            raise serializers.ValidationError(
-                'Рецепт уже добавлен в списке покупок'
-            )
-        return data
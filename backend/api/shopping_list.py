@@ -0,0 +1,136 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipe.models import ShoppingCart
+from .versions import bump_version, get_version
+
+CART_VERSION_KEY = 'shopping_cart_version:{user_id}'
+SHOPPING_LIST_KEY = 'shopping_list:{user_id}:{version}:{format}'
+TITLE = 'Список покупок'
+
+
+def get_cart_version(user_id):
+    return get_version(CART_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_cart_version(*user_ids):
+    keys = [CART_VERSION_KEY.format(user_id=user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: bump_version(*keys))
+
+
+def bump_cart_version_for_recipes(*recipe_ids):
+    bump_cart_version(*ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', flat=True))
+
+
+def shopping_list_rows(user):
+    return user.shopping_list.values_list(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount'
+    ).order_by('ingredient__name').iterator()
+
+
+def render_txt(rows):
+    yield f'{TITLE}:\n\n'
+    for name, unit, amount in rows:
+        yield f'{name} - {amount}{unit}\n'
+
+
+class _Echo:
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for row in rows:
+        yield writer.writerow((row[0], row[2], row[1]))
+
+
+def _pdf_font():
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    if not os.path.exists(font_path):
+        return 'Helvetica'
+    font_name = os.path.splitext(os.path.basename(font_path))[0]
+    if font_name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(font_name, font_path))
+    return font_name
+
+
+def render_pdf(rows):
+    buffer = io.BytesIO()
+    font = _pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+    pdf.setFont(font, 16)
+    pdf.drawString(margin, height - margin, TITLE)
+    pdf.setFont(font, 12)
+    y = height - margin - 2 * line_height
+    for name, unit, amount in rows:
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = height - margin
+        pdf.drawString(margin, y, f'{name} - {amount}{unit}')
+        y -= line_height
+    pdf.save()
+    yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
+
+
+def _encode(chunks):
+    for chunk in chunks:
+        yield chunk.encode() if isinstance(chunk, str) else chunk
+
+
+def _cache_on_complete(key, chunks):
+    rendered = []
+    for chunk in chunks:
+        rendered.append(chunk)
+        yield chunk
+    cache.set(
+        key, b''.join(rendered), timeout=settings.SHOPPING_LIST_CACHE_TIMEOUT
+    )
+
+
+def shopping_list_response(user, export_format):
+    render, content_type = EXPORT_FORMATS[export_format]
+    key = SHOPPING_LIST_KEY.format(
+        user_id=user.id,
+        version=get_cart_version(user.id),
+        format=export_format
+    )
+    content = cache.get(key)
+    if content is not None:
+        chunks = (content,)
+    else:
+        chunks = _cache_on_complete(
+            key, _encode(render(shopping_list_rows(user)))
+        )
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    filename = f'shopping_cart.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
@@ -0,0 +1,171 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from foodgram.counters import change_counter
+from recipe.models import Ingredient, Recipe, ShoppingListItem, Tag
+from .authentication import forget_tokens, forget_user_tokens
+from .documents import (bump_all_recipe_documents, bump_author_documents,
+                        bump_recipe_documents)
+from .images import schedule_variants
+from .reference import bump_reference_version
+from .response_cache import (bump_all_recipe_responses,
+                             bump_recipe_responses, bump_recipe_responses_for)
+from .search import bump_ingredient_index_version
+from .shopping_list import bump_cart_version, bump_cart_version_for_recipes
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(id=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    bump_cart_version(*ShoppingListItem.objects.discard_recipe(instance.id))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_unpublished(sender, instance, **kwargs):
+    change_counter(
+        User.objects.filter(id=instance.author_id), 'recipes_count', -1
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    change_counter(
+        Recipe.objects.filter(favorite_recipe__user=instance),
+        'favorites_count',
+        -1
+    )
+    change_counter(
+        Recipe.objects.filter(recipe_shopping_cart__user=instance),
+        'in_carts_count',
+        -1
+    )
+    change_counter(
+        User.objects.filter(following__user=instance),
+        'followers_count',
+        -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_cart_version_for_recipes(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_document_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_recipe_documents(instance.id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Recipe):
+        bump_recipe_documents(instance.id)
+    else:
+        bump_all_recipe_documents()
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    bump_author_documents(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_response_changed(sender, instance, **kwargs):
+    bump_recipe_responses_for(instance.id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_response_deleted(sender, instance, **kwargs):
+    bump_recipe_responses_for(instance.id)
+    bump_recipe_documents(instance.id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_response_tags_changed(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Recipe):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_all_recipe_responses()
+    elif action == 'pre_clear':
+        bump_recipe_responses_for(instance.id)
+    elif action in ('post_add', 'post_remove'):
+        bump_recipe_responses(
+            (instance.author_id,),
+            Tag.objects.filter(id__in=pk_set).values_list('slug', flat=True)
+        )
+
+
+@receiver(post_save, sender=User)
+def author_response_changed(sender, instance, created, update_fields,
+                            **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    if Recipe.objects.filter(author_id=instance.id).exists():
+        bump_all_recipe_responses()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def recipe_responses_changed(sender, **kwargs):
+    bump_all_recipe_responses()
+
+
+@receiver(post_save, sender=User)
+def user_credentials_changed(sender, instance, created, update_fields,
+                             **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    forget_user_tokens(instance.id)
+
+
+@receiver((post_save, post_delete), sender=Token)
+def token_changed(sender, instance, **kwargs):
+    forget_tokens(instance.key)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def recipe_documents_changed(sender, **kwargs):
+    bump_all_recipe_documents()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    schedule_variants(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_cart_version_for_recipes(*Recipe.objects.filter(
+            ingredients=instance
+        ).values_list('id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_catalogue_changed(sender, **kwargs):
+    bump_ingredient_index_version()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def reference_data_changed(sender, **kwargs):
+    bump_reference_version()
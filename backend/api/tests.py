@@ -0,0 +1,227 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipe.models import (FavoriteRecipe, Ingredient, IngredientsInRecipe,
+                           Recipe, ShoppingCart, ShoppingListItem, Subscribe,
+                           Tag)
+
+User = get_user_model()
+
+
+class RecipeListQueriesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com'
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {i}', color='#000000', slug=f't{i}')
+            for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {i}', measurement_unit='г'
+            )
+            for i in range(3)
+        ]
+        Subscribe.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = APIClient()
+        self.authenticated = APIClient()
+        self.authenticated.force_authenticate(self.user)
+
+    def create_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name=f'Рецепт {i}',
+                image='recipe/image/test.jpg',
+                text='Описание',
+                cooking_time=10
+            )
+            recipe.tags.set(self.tags)
+            IngredientsInRecipe.objects.bulk_create(
+                IngredientsInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in self.ingredients
+            )
+            FavoriteRecipe.objects.create(
+                user=self.user, favorite_recipe=recipe
+            )
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def count_queries(self, client):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return len(context), len(response.json()['results'])
+
+    def assert_constant_queries(self):
+        self.create_recipes(1)
+        small = {
+            'anonymous': self.count_queries(self.anonymous),
+            'authenticated': self.count_queries(self.authenticated),
+        }
+        self.create_recipes(5)
+        for name, client in (
+            ('anonymous', self.anonymous),
+            ('authenticated', self.authenticated),
+        ):
+            with self.subTest(client=name):
+                queries, page_size = small[name]
+                self.assertEqual(page_size, 1)
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = client.get('/api/recipes/')
+                self.assertEqual(len(response.json()['results']), 6)
+
+    def test_serializer_path(self):
+        with override_settings(RECIPE_LIST_FAST_PATH=False):
+            self.assert_constant_queries()
+
+    def test_fast_path(self):
+        self.assert_constant_queries()
+
+
+class ShoppingListTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com'
+        )
+        cls.author = User.objects.create_user(
+            username='cook', email='cook@example.com'
+        )
+        cls.tag = Tag.objects.create(
+            name='Обед', color='#000000', slug='lunch'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {i}', measurement_unit='г'
+            )
+            for i in range(4)
+        ]
+        cls.soup = cls.create_recipe('Суп', {0: 100, 1: 50})
+        cls.salad = cls.create_recipe('Салат', {1: 30, 2: 20})
+
+    @classmethod
+    def create_recipe(cls, name, amounts):
+        recipe = Recipe.objects.create(
+            author=cls.author,
+            name=name,
+            image='recipe/image/test.jpg',
+            text='Описание',
+            cooking_time=10
+        )
+        recipe.tags.set((cls.tag,))
+        IngredientsInRecipe.objects.bulk_create(
+            IngredientsInRecipe(
+                recipe=recipe,
+                ingredient=cls.ingredients[index],
+                amount=amount
+            )
+            for index, amount in amounts.items()
+        )
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+        self.buyer = APIClient()
+        self.buyer.force_authenticate(self.user)
+        self.cook = APIClient()
+        self.cook.force_authenticate(self.author)
+
+    def shopping_list(self):
+        return {
+            ingredient_id: amount
+            for user_id, ingredient_id, amount in
+            ShoppingListItem.objects.filter(user=self.user).values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+
+    def assert_matches_carts(self, expected):
+        self.assertEqual(
+            {
+                (self.user.id, self.ingredients[index].id): amount
+                for index, amount in expected.items()
+            },
+            ShoppingListItem.objects.aggregate_from_carts((self.user.id,))
+        )
+        self.assertEqual(
+            self.shopping_list(),
+            {
+                self.ingredients[index].id: amount
+                for index, amount in expected.items()
+            }
+        )
+
+    def add_to_cart(self, recipe):
+        response = self.buyer.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+
+    def edit_ingredients(self, recipe, amounts):
+        return self.cook.patch(
+            f'/api/recipes/{recipe.id}/',
+            {
+                'ingredients': [
+                    {'id': self.ingredients[index].id, 'amount': amount}
+                    for index, amount in amounts
+                ],
+                'tags': [self.tag.id],
+            },
+            format='json'
+        )
+
+    def test_add_recipes_with_shared_ingredient(self):
+        self.add_to_cart(self.soup)
+        self.assert_matches_carts({0: 100, 1: 50})
+        self.add_to_cart(self.salad)
+        self.assert_matches_carts({0: 100, 1: 80, 2: 20})
+
+    def test_remove_recipe(self):
+        self.add_to_cart(self.soup)
+        self.add_to_cart(self.salad)
+        response = self.buyer.delete(
+            f'/api/recipes/{self.soup.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_matches_carts({1: 30, 2: 20})
+        self.buyer.delete(f'/api/recipes/{self.salad.id}/shopping_cart/')
+        self.assert_matches_carts({})
+
+    def test_change_recipe_ingredients(self):
+        self.add_to_cart(self.soup)
+        self.add_to_cart(self.salad)
+        response = self.edit_ingredients(self.soup, ((0, 150), (3, 10)))
+        self.assertEqual(response.status_code, 200)
+        self.assert_matches_carts({0: 150, 1: 30, 2: 20, 3: 10})
+        response = self.edit_ingredients(self.salad, ((1, 5),))
+        self.assertEqual(response.status_code, 200)
+        self.assert_matches_carts({0: 150, 1: 5, 3: 10})
+
+    def test_duplicate_ingredients_rejected(self):
+        self.add_to_cart(self.soup)
+        response = self.edit_ingredients(self.soup, ((0, 10), (0, 20)))
+        self.assertEqual(response.status_code, 400)
+        self.assert_matches_carts({0: 100, 1: 50})
+
+    def test_recipe_deleted(self):
+        self.add_to_cart(self.soup)
+        self.add_to_cart(self.salad)
+        response = self.cook.delete(f'/api/recipes/{self.salad.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_matches_carts({0: 100, 1: 50})
@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (CustomUserViewSet, FavoriteRecipeViewSet,
-                    IngredientViewSet, RecipeViewSet, ShoppingCartViewSet,
-                    SubscribeViewSet, TagViewSet)
+                    IngredientViewSet, RecipeViewSet, ReferenceDataView,
+                    ShoppingCartViewSet, SubscribeViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -29,6 +29,7 @@ router.register(
 )
 
 urlpatterns = [
+    path('reference/', ReferenceDataView.as_view(), name='reference'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
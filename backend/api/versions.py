@@ -0,0 +1,30 @@
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared():
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def get_version(key):
+    return cache.get_or_set(key, time.time_ns(), timeout=None)
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        cache.add(key, time.time_ns(), timeout=None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def bump_version(*keys):
+    for key in set(keys):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
@@ -1,73 +1,161 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
 from djoser.views import UserViewSet
+from prometheus_client import CONTENT_TYPE_LATEST
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
+from rest_framework.permissions import (SAFE_METHODS, AllowAny,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.views import APIView
 
-from recipe.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                           Subscribe, Tag)
+from recipe.models import (FavoriteRecipe, FeedEntry, Ingredient, Recipe,
+                           ShoppingCart, ShoppingListItem, Subscribe, Tag)
+from .fastpath import serialize_recipe_page
+from .metrics import export_metrics
 from .filters import IngredientFilter, RecipeFilter
-from .mixins import CreateDestroyViewSet
+from .mixins import CreateDestroyViewSet, UserRelationMixin
+from .pagination import PageNumberOrKeysetPagination, SubscriptionPagination
+from .parsers import MultiPartJSONParser
 from .permissions import IsAuthorOrReadOnly
+from .reference import get_reference_bundle
+from .renderers import (CSVRenderer, FormatContentNegotiation,
+                        ORJSONRenderer, PDFRenderer, PlainTextRenderer)
+from .response_cache import (cached_recipe_response, detail_generation_keys,
+                             list_generation_keys)
 from .serializers import (FavoriteRecipeSerializer, IngredientSerializer,
                           RecipeEditSerializer, RecipeReadSerializer,
                           SetPasswordSerializer, ShoppingCartSerializer,
                           SubscribeSerializer, TagSerializer,
                           UserCreateSerializer, UserListSerializer)
+from .search import ingredient_index, ranked_ingredient_search
+from .shopping_list import bump_cart_version, shopping_list_response
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return None
+    if not recipes_limit.isdigit():
+        raise ValidationError(
+            {'recipes_limit': 'Нужно целое неотрицательное число'}
+        )
+    return int(recipes_limit)
+
+
 class RecipeViewSet(viewsets.ModelViewSet):
 
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
+    pagination_class = PageNumberOrKeysetPagination
+    parser_classes = (JSONParser, MultiPartJSONParser)
+    response_cache_params = frozenset((
+        *RecipeFilter.base_filters, 'page', 'limit', 'cursor', 'format'
+    ))
+
+    def get_queryset(self):
+        if self.action == 'retrieve' and settings.RECIPE_LIST_FAST_PATH:
+            return Recipe.objects.only('id')
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read(self.request.user)
+        return super().get_queryset()
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeEditSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        recipe = serializer.save(author=self.request.user)
+        FeedEntry.objects.fan_out(recipe)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (
+            self.action == 'download_file'
+            and isinstance(response, Response)
+            and not status.is_success(response.status_code)
+        ):
+            response.accepted_renderer = ORJSONRenderer()
+            response.accepted_media_type = ORJSONRenderer.media_type
+        return response
+
+    def list_recipes(self, queryset):
+        if not settings.RECIPE_LIST_FAST_PATH:
+            page = self.paginate_queryset(
+                queryset.for_read(self.request.user)
+            )
+            data = RecipeReadSerializer(
+                page,
+                many=True,
+                context=self.get_serializer_context()
+            ).data
+        else:
+            page = self.paginate_queryset(
+                queryset.only('id', 'publication_date')
+            )
+            data = serialize_recipe_page(page, self.request)
+        return self.get_paginated_response(data)
+
+    def list(self, request, *args, **kwargs):
+        return cached_recipe_response(
+            request,
+            list_generation_keys(request.query_params),
+            self.response_cache_params,
+            lambda: self.list_recipes(
+                self.filter_queryset(Recipe.objects.all())
+            )
+        )
+
+    def retrieve_recipe(self, request, *args, **kwargs):
+        if not settings.RECIPE_LIST_FAST_PATH:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(
+            serialize_recipe_page([self.get_object()], request)[0]
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_recipe_response(
+            request,
+            detail_generation_keys(kwargs[self.lookup_field]),
+            ('format',),
+            lambda: self.retrieve_recipe(request, *args, **kwargs)
+        )
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        return self.list_recipes(Recipe.objects.feed(request.user).order_by(
+            '-publication_date', '-id'
+        ))
 
     @action(
         detail=False,
         methods=('get',),
         url_path='download_shopping_cart',
-        pagination_class=None)
+        pagination_class=None,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, PDFRenderer),
+        content_negotiation_class=FormatContentNegotiation)
     def download_file(self, request):
         user = request.user
         if not user.shopping_cart.exists():
             return Response(
                 'В корзине нет товаров', status=status.HTTP_400_BAD_REQUEST)
-
-        text = 'Список покупок:\n\n'
-        ingredient_name = 'recipe__recipe__ingredient__name'
-        ingredient_unit = 'recipe__recipe__ingredient__measurement_unit'
-        recipe_amount = 'recipe__recipe__amount'
-        amount_sum = 'recipe__recipe__amount__sum'
-        cart = user.shopping_cart.select_related('recipe').values(
-            ingredient_name,
-            ingredient_unit
-        ).annotate(Sum(recipe_amount)).order_by(ingredient_name)
-        for _ in cart:
-            text += (
-                f'{_[ingredient_name]} - {_[amount_sum]}'
-                f'{_[ingredient_unit]}\n'
-            )
-        response = HttpResponse(text, content_type='text/plain')
-        filename = 'shopping_cart.txt'
-        response['Content-Disposition'] = f'attachment; filename={filename}'
-        return response
+        return shopping_list_response(user, request.accepted_renderer.format)
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -78,6 +166,15 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        search = request.query_params.get('search')
+        if search:
+            return Response(ranked_ingredient_search(search))
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
 
@@ -87,11 +184,53 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
+class ReferenceDataView(APIView):
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        bundle = get_reference_bundle()
+        etag = bundle['etag']
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(
+                bundle['gzip'], content_type='application/json'
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                bundle['content'], content_type='application/json'
+            )
+        response['ETag'] = etag
+        if request.query_params.get('v') == etag.strip('"'):
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class MetricsView(APIView):
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        return HttpResponse(export_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
 class CustomUserViewSet(UserViewSet):
 
     queryset = User.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    def get_queryset(self):
+        return super().get_queryset().with_subscription_flag(
+            self.request.user
+        )
+
     def get_serializer_class(self):
         if self.action == 'set_password':
             return SetPasswordSerializer
@@ -106,9 +245,14 @@ class CustomUserViewSet(UserViewSet):
 
     @action(
         detail=False,
-        permission_classes=(IsAuthenticated,))
+        permission_classes=(IsAuthenticated,),
+        pagination_class=SubscriptionPagination)
     def subscriptions(self, request):
-        queryset = Subscribe.objects.filter(user=request.user)
+        queryset = Subscribe.objects.filter(
+            user=request.user
+        ).with_author_recipes(
+            get_recipes_limit(request)
+        ).order_by('-follow_date', '-id')
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(
             pages,
@@ -118,9 +262,15 @@ class CustomUserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class SubscribeViewSet(CreateDestroyViewSet):
+class SubscribeViewSet(UserRelationMixin, CreateDestroyViewSet):
 
     serializer_class = SubscribeSerializer
+    target_model = User
+    target_field = 'author'
+    target_kwarg = 'user_id'
+    missing_message = 'Вы не были подписаны на автора'
+    check_target_on_delete = True
+    counter_field = 'followers_count'
 
     def get_queryset(self):
         return self.request.user.follower.all()
@@ -128,110 +278,53 @@ class SubscribeViewSet(CreateDestroyViewSet):
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['author_id'] = self.kwargs.get('user_id')
+        context['recipes_limit'] = get_recipes_limit(self.request)
         return context
 
-    def perform_create(self, serializer):
-        serializer.save(
-            user=self.request.user,
-            author=get_object_or_404(
-                User,
-                id=self.kwargs.get('user_id')
-            )
-        )
+    def relation_added(self, author_id):
+        super().relation_added(author_id)
+        FeedEntry.objects.backfill(self.request.user.id, author_id)
 
-    @action(methods=('delete',), detail=True)
-    def delete(self, request, user_id):
-        get_object_or_404(User, id=user_id)
-        if not Subscribe.objects.filter(
-            user=request.user,
-            author_id=user_id
-        ).exists():
-            return Response(
-                'Вы не были подписаны на автора',
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        get_object_or_404(
-            Subscribe,
-            user=request.user,
-            author_id=user_id
-        ).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    def relation_removed(self, author_id):
+        super().relation_removed(author_id)
+        FeedEntry.objects.prune(self.request.user.id, author_id)
 
 
-class FavoriteRecipeViewSet(viewsets.ModelViewSet):
+class FavoriteRecipeViewSet(UserRelationMixin, viewsets.ModelViewSet):
 
     serializer_class = FavoriteRecipeSerializer
+    target_model = Recipe
+    target_field = 'favorite_recipe'
+    target_kwarg = 'recipe_id'
+    missing_message = 'Рецепт не в избранном'
+    counter_field = 'favorites_count'
 
     def get_queryset(self):
         user = self.request.user.id
         return FavoriteRecipe.objects.filter(user=user)
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['recipe_id'] = self.kwargs.get('recipe_id')
-        return context
-
-    def perform_create(self, serializer):
-        serializer.save(
-            user=self.request.user,
-            favorite_recipe=get_object_or_404(
-                Recipe,
-                id=self.kwargs.get('recipe_id')
-            )
-        )
-
-    @action(methods=('delete',), detail=True)
-    def delete(self, request, recipe_id):
-        u = request.user
-        if not u.favorite.select_related(
-            'favorite_recipe'
-        ).filter(favorite_recipe_id=recipe_id).exists():
-            return Response(
-                'Рецепт не в избранном',
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        get_object_or_404(
-            FavoriteRecipe,
-            user=request.user,
-            favorite_recipe_id=recipe_id
-        ).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
 
-
-class ShoppingCartViewSet(CreateDestroyViewSet):
+class ShoppingCartViewSet(UserRelationMixin, CreateDestroyViewSet):
 
     serializer_class = ShoppingCartSerializer
+    target_model = Recipe
+    target_field = 'recipe'
+    target_kwarg = 'recipe_id'
+    missing_message = 'Рецепта нет в корзине'
+    counter_field = 'in_carts_count'
 
     def get_queryset(self):
         user = self.request.user.id
         return ShoppingCart.objects.filter(user=user)
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['recipe_id'] = self.kwargs.get('recipe_id')
-        return context
+    def relation_added(self, recipe_id):
+        super().relation_added(recipe_id)
+        ShoppingListItem.objects.add_recipe(self.request.user.id, recipe_id)
+        bump_cart_version(self.request.user.id)
 
-    def perform_create(self, serializer):
-        serializer.save(
-            user=self.request.user,
-            recipe=get_object_or_404(
-                Recipe,
-                id=self.kwargs.get('recipe_id')
-            )
+    def relation_removed(self, recipe_id):
+        super().relation_removed(recipe_id)
+        ShoppingListItem.objects.remove_recipe(
+            self.request.user.id, recipe_id
         )
-
-    @action(methods=('delete',), detail=True)
-    def delete(self, request, recipe_id):
-        u = request.user
-        if not u.shopping_cart.select_related(
-            'recipe'
-        ).filter(recipe_id=recipe_id).exists():
-            return Response(
-                'Рецепта нет в корзине',
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        get_object_or_404(
-            ShoppingCart,
-            user=request.user,
-            recipe=recipe_id).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        bump_cart_version(self.request.user.id)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+
+    def estimated_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if (
+            estimate is not None
+            and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        ):
+            return estimate
+        return super().count
+
+
+class ScalableAdmin(admin.ModelAdmin):
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
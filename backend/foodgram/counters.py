@@ -0,0 +1,29 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def change_counter(queryset, field, delta):
+    if delta >= 0:
+        return queryset.update(**{field: F(field) + delta})
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+class CounterFieldsMixin:
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
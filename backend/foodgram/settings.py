@@ -33,6 +33,8 @@ AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,15 +74,30 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
@@ -120,6 +137,10 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+DEFAULT_FILE_STORAGE = 'recipe.storage.ContentAddressedStorage'
+
+MEDIA_GC_MIN_AGE = 60 * 60 * 24
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
@@ -127,6 +148,83 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CSV_FILES_UP = os.path.join(BASE_DIR, 'data')
 
+INGREDIENT_INDEX_MAX_AGE = 60 * 5
+
+REFERENCE_BUNDLE_MAX_AGE = 60 * 5
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+INGREDIENT_SEARCH_POOL_FACTOR = 4
+
+INGREDIENT_SEARCH_MIN_SIMILARITY = 0.5
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+SHOPPING_LIST_REBUILD_BATCH_SIZE = 500
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+COMPRESSION_MIN_SIZE = 1024
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'text/',
+    'application/json',
+    'application/msgpack',
+    'application/javascript',
+)
+
+RECIPE_LIST_FAST_PATH = True
+
+RECIPE_DOCUMENT_CACHE = True
+
+RECIPE_DOCUMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_RESPONSE_CACHE = True
+
+RECIPE_RESPONSE_CACHE_TIMEOUT = 60
+
+RECIPE_RESPONSE_LOCK_TIMEOUT = 5
+
+RECIPE_RESPONSE_LOCK_POLL = 0.05
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+
+AUTH_TOKEN_NEGATIVE_CACHE_TIMEOUT = 30
+
+MEMBERSHIPS_CACHE_TIMEOUT = 60 * 60 * 24
+
+MEMBERSHIPS_FILTER_MAX_IDS = 1000
+
+FEED_FANOUT_MAX_FOLLOWERS = 5000
+
+FEED_BACKFILL_SIZE = 100
+
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_SIDE = 6000
+
+IMAGE_VARIANTS_DIR = 'recipe/variants/'
+
+IMAGE_VARIANTS = {
+    'card': 480,
+    'detail': 960,
+    'retina': 1920,
+}
+
+IMAGE_VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+IMAGE_VARIANTS_ASYNC = True
+
+IMAGE_VARIANTS_WORKERS = 2
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 LENGTH_EMAIL = 254
 
 LENGTH_USERNAME = 150
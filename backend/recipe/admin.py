@@ -1,16 +1,26 @@
 from django.contrib import admin
 
-from .models import (FavoriteRecipe, Ingredient, IngredientsInRecipe, Recipe,
-                     ShoppingCart, Subscribe, Tag)
+from api.memberships import bump_memberships
+from api.shopping_list import bump_cart_version
+from foodgram.admin import ScalableAdmin
+from foodgram.counters import change_counter
+
+from .models import (FavoriteRecipe, FeedEntry, Ingredient,
+                     IngredientsInRecipe, Recipe, ShoppingCart,
+                     ShoppingListItem, Subscribe, Tag)
 
 
 class IngredientsInRecipeInline(admin.TabularInline):
     model = IngredientsInRecipe
     extra = 0
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ScalableAdmin):
 
     list_display = (
         'id',
@@ -19,35 +29,43 @@ class RecipeAdmin(admin.ModelAdmin):
         'count_favorite',
         'publication_date'
     )
+    list_select_related = ('author',)
     search_fields = (
-        'author',
-        'name',
-        'tags',
-        'publication_date'
-    )
-    list_filter = (
-        'author',
-        'name',
-        'tags'
+        '^name',
+        '=author__username',
     )
+    list_filter = ('tags',)
+    autocomplete_fields = ('author',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
     inlines = (IngredientsInRecipeInline, )
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            user_ids = list(form.instance.recipe_shopping_cart.values_list(
+                'user_id', flat=True
+            ))
+            ShoppingListItem.objects.rebuild(user_ids=user_ids)
+            bump_cart_version(*user_ids)
+
     def count_favorite(self, obj):
-        return FavoriteRecipe.objects.filter(favorite_recipe=obj).count()
+        return obj.favorites_count
 
     count_favorite.short_description = 'В избранном'
+    count_favorite.admin_order_field = 'favorites_count'
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScalableAdmin):
 
     list_display = (
         'id',
         'name',
         'measurement_unit',
     )
-    search_fields = ('name',)
+    search_fields = ('^name',)
+    ordering = ('name',)
 
 
 @admin.register(Tag)
@@ -63,48 +81,121 @@ class TagAdmin(admin.ModelAdmin):
     list_filter = ('name',)
 
 
+class UserRelationAdmin(ScalableAdmin):
+
+    target_field = None
+    counter_field = None
+
+    def update_counter(self, target_id, delta):
+        target_model = self.model._meta.get_field(
+            self.target_field
+        ).related_model
+        change_counter(
+            target_model.objects.filter(id=target_id),
+            self.counter_field,
+            delta
+        )
+
+    def relation_added(self, user_id, target_id):
+        self.update_counter(target_id, 1)
+
+    def relation_removed(self, user_id, target_id):
+        self.update_counter(target_id, -1)
+
+    def relations_changed(self, user_ids):
+        bump_memberships(*user_ids)
+
+    def save_model(self, request, obj, form, change):
+        old_user_id = form.initial.get('user')
+        old_target_id = form.initial.get(self.target_field)
+        super().save_model(request, obj, form, change)
+        target_id = getattr(obj, f'{self.target_field}_id')
+        if not change:
+            self.relation_added(obj.user_id, target_id)
+        elif (old_user_id, old_target_id) != (obj.user_id, target_id):
+            self.relation_removed(old_user_id, old_target_id)
+            self.relation_added(obj.user_id, target_id)
+        self.relations_changed({obj.user_id, old_user_id or obj.user_id})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.relation_removed(
+            obj.user_id, getattr(obj, f'{self.target_field}_id')
+        )
+        self.relations_changed({obj.user_id})
+
+    def delete_queryset(self, request, queryset):
+        relations = list(queryset.values_list(
+            'user_id', f'{self.target_field}_id'
+        ))
+        super().delete_queryset(request, queryset)
+        for user_id, target_id in relations:
+            self.relation_removed(user_id, target_id)
+        self.relations_changed({user_id for user_id, _ in relations})
+
+
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(UserRelationAdmin):
 
     list_display = (
         'id',
         'user',
         'recipe',
     )
+    list_select_related = ('user', 'recipe')
     search_fields = (
-        'user',
-        'recipe'
-    )
-    list_filter = (
-        'user',
-        'recipe'
+        '=user__username',
+        '^recipe__name'
     )
+    autocomplete_fields = ('user', 'recipe')
+    target_field = 'recipe'
+    counter_field = 'in_carts_count'
+
+    def relations_changed(self, user_ids):
+        super().relations_changed(user_ids)
+        ShoppingListItem.objects.rebuild(user_ids=user_ids)
+        bump_cart_version(*user_ids)
 
 
 @admin.register(FavoriteRecipe)
-class FavoriteRecipeAdmin(admin.ModelAdmin):
+class FavoriteRecipeAdmin(UserRelationAdmin):
 
     list_display = (
         'id',
         'user',
         'favorite_recipe',
     )
-    search_fields = ('user',)
-    list_filter = ('user',)
+    list_select_related = ('user', 'favorite_recipe')
+    search_fields = (
+        '=user__username',
+        '^favorite_recipe__name'
+    )
+    autocomplete_fields = ('user', 'favorite_recipe')
+    target_field = 'favorite_recipe'
+    counter_field = 'favorites_count'
 
 
 @admin.register(Subscribe)
-class SubscribeAdmin(admin.ModelAdmin):
+class SubscribeAdmin(UserRelationAdmin):
     list_display = (
         'id',
         'author',
         'user',
         'follow_date'
     )
+    list_select_related = ('author', 'user')
     search_fields = (
-        'author',
-        'follow_date')
-    list_filter = (
-        'author',
-        'user',
-        'follow_date')
+        '=author__username',
+        '=user__username')
+    list_filter = ('follow_date',)
+    autocomplete_fields = ('author', 'user')
+    target_field = 'author'
+    counter_field = 'followers_count'
+
+    def relation_added(self, user_id, target_id):
+        super().relation_added(user_id, target_id)
+        FeedEntry.objects.backfill(user_id, target_id)
+
+    def relation_removed(self, user_id, target_id):
+        super().relation_removed(user_id, target_id)
+        FeedEntry.objects.prune(user_id, target_id)
@@ -0,0 +1,57 @@
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipe_ingredient_fts USING fts5("
+    "name, content='recipe_ingredient', content_rowid='id', "
+    "tokenize='trigram')",
+    'DROP TRIGGER IF EXISTS recipe_ingredient_fts_insert',
+    'DROP TRIGGER IF EXISTS recipe_ingredient_fts_delete',
+    'DROP TRIGGER IF EXISTS recipe_ingredient_fts_update',
+    'CREATE TRIGGER recipe_ingredient_fts_insert '
+    'AFTER INSERT ON recipe_ingredient BEGIN '
+    'INSERT INTO recipe_ingredient_fts(rowid, name) '
+    'VALUES (new.id, new.name); END',
+    'CREATE TRIGGER recipe_ingredient_fts_delete '
+    'AFTER DELETE ON recipe_ingredient BEGIN '
+    'INSERT INTO recipe_ingredient_fts(recipe_ingredient_fts, rowid, name) '
+    "VALUES ('delete', old.id, old.name); END",
+    'CREATE TRIGGER recipe_ingredient_fts_update '
+    'AFTER UPDATE ON recipe_ingredient BEGIN '
+    'INSERT INTO recipe_ingredient_fts(recipe_ingredient_fts, rowid, name) '
+    "VALUES ('delete', old.id, old.name); "
+    'INSERT INTO recipe_ingredient_fts(rowid, name) '
+    'VALUES (new.id, new.name); END',
+    'INSERT INTO recipe_ingredient_fts(recipe_ingredient_fts) '
+    "VALUES ('rebuild')",
+)
+SQLITE_DROP = (
+    'DROP TRIGGER IF EXISTS recipe_ingredient_fts_insert',
+    'DROP TRIGGER IF EXISTS recipe_ingredient_fts_delete',
+    'DROP TRIGGER IF EXISTS recipe_ingredient_fts_update',
+    'DROP TABLE IF EXISTS recipe_ingredient_fts',
+)
+POSTGRESQL_CREATE = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS recipe_ingredient_name_trgm '
+    'ON recipe_ingredient USING gin (name gin_trgm_ops)',
+)
+POSTGRESQL_DROP = (
+    'DROP INDEX IF EXISTS recipe_ingredient_name_trgm',
+)
+
+
+def _execute(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def create_ingredient_search_index(apps, schema_editor):
+    _execute(schema_editor, {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRESQL_CREATE,
+    })
+
+
+def drop_ingredient_search_index(apps, schema_editor):
+    _execute(schema_editor, {
+        'sqlite': SQLITE_DROP,
+        'postgresql': POSTGRESQL_DROP,
+    })
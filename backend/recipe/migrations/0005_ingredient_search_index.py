@@ -0,0 +1,20 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:40
+
+from django.db import migrations
+
+from recipe.fts import (create_ingredient_search_index,
+                        drop_ingredient_search_index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0004_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_ingredient_search_index,
+            drop_ingredient_search_index
+        ),
+    ]
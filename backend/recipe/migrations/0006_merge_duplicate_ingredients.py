@@ -0,0 +1,50 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipe', 'Ingredient')
+    IngredientsInRecipe = apps.get_model('recipe', 'IngredientsInRecipe')
+    ShoppingListItem = apps.get_model('recipe', 'ShoppingListItem')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=models.Min('id'),
+        count=models.Count('id')
+    ).filter(count__gt=1).order_by()
+    for duplicate in duplicates:
+        keep_id = duplicate['keep_id']
+        extra_ids = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']
+        ).exclude(id=keep_id).values_list('id', flat=True))
+        IngredientsInRecipe.objects.filter(
+            ingredient_id__in=extra_ids
+        ).update(ingredient_id=keep_id)
+        for item in ShoppingListItem.objects.filter(
+            ingredient_id__in=extra_ids
+        ):
+            kept, created = ShoppingListItem.objects.get_or_create(
+                user_id=item.user_id,
+                ingredient_id=keep_id,
+                defaults={'amount': 0}
+            )
+            kept.amount += item.amount
+            kept.save(update_fields=('amount',))
+            item.delete()
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_ingredient_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop
+        ),
+    ]
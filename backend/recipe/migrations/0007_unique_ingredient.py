@@ -0,0 +1,23 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+from recipe.fts import create_ingredient_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_merge_duplicate_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+        migrations.RunPython(
+            create_ingredient_search_index,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.13 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-publication_date', '-id'], name='recipe_publication_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscribe',
+            index=models.Index(fields=['user', '-follow_date', '-id'], name='subscribe_user_follow_idx'),
+        ),
+    ]
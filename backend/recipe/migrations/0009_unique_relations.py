@@ -0,0 +1,94 @@
+# Generated by Django 3.2.13 on 2026-10-18 20:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_duplicates(model, fields, merge_field=None):
+    duplicates = model.objects.values(*fields).annotate(
+        keep_id=models.Min('id'),
+        count=models.Count('id')
+    ).filter(count__gt=1).order_by()
+    for duplicate in duplicates:
+        keep_id = duplicate.pop('keep_id')
+        duplicate.pop('count')
+        rows = model.objects.filter(**duplicate)
+        if merge_field is not None:
+            rows.filter(id=keep_id).update(**{
+                merge_field: rows.aggregate(total=models.Sum(merge_field))[
+                    'total'
+                ]
+            })
+        rows.exclude(id=keep_id).delete()
+
+
+def deduplicate_relations(apps, schema_editor):
+    delete_duplicates(
+        apps.get_model('recipe', 'FavoriteRecipe'),
+        ('user', 'favorite_recipe')
+    )
+    delete_duplicates(
+        apps.get_model('recipe', 'ShoppingCart'),
+        ('user', 'recipe')
+    )
+    delete_duplicates(
+        apps.get_model('recipe', 'Subscribe'),
+        ('user', 'author')
+    )
+    delete_duplicates(
+        apps.get_model('recipe', 'IngredientsInRecipe'),
+        ('recipe', 'ingredient'),
+        merge_field='amount'
+    )
+
+
+def rebuild_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipe', 'ShoppingCart')
+    ShoppingListItem = apps.get_model('recipe', 'ShoppingListItem')
+    ShoppingListItem.objects.all().delete()
+    totals = ShoppingCart.objects.values_list(
+        'user_id',
+        'recipe__recipe__ingredient_id'
+    ).annotate(
+        total=models.Sum('recipe__recipe__amount')
+    ).filter(total__gt=0).order_by()
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                amount=total
+            )
+            for user_id, ingredient_id, total in totals
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_relations, migrations.RunPython.noop),
+        migrations.RunPython(rebuild_shopping_lists, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'favorite_recipe'), name='unique_favorite_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientsinrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_ingredient_in_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscribe',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_subscribe'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.13 on 2026-10-18 21:10
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    return Coalesce(models.Subquery(
+        model.objects.filter(**{field: models.OuterRef('pk')}).order_by(
+        ).values(field).annotate(count=models.Count('id')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    User = apps.get_model('users', 'User')
+    Recipe.objects.update(
+        favorites_count=count_of(
+            apps.get_model('recipe', 'FavoriteRecipe'), 'favorite_recipe'
+        ),
+        in_carts_count=count_of(
+            apps.get_model('recipe', 'ShoppingCart'), 'recipe'
+        )
+    )
+    User.objects.update(
+        recipes_count=count_of(Recipe, 'author'),
+        followers_count=count_of(
+            apps.get_model('recipe', 'Subscribe'), 'author'
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_counters'),
+        ('recipe', '0009_unique_relations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='В избранном'
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='В списках покупок'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_popularity_idx'
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.13 on 2026-10-18 21:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                verbose_name='Уменьшенные копии фото'
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.13 on 2026-10-18 22:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    FeedEntry = apps.get_model('recipe', 'FeedEntry')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Subscribe = apps.get_model('recipe', 'Subscribe')
+    for user_id, author_id in Subscribe.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in Recipe.objects.filter(
+                    author_id=author_id
+                ).order_by('-publication_date', '-id').values_list(
+                    'id', flat=True
+                )[:settings.FEED_BACKFILL_SIZE]
+            ),
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0011_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID'
+                )),
+                ('recipe', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='feed_entries',
+                    to='recipe.recipe',
+                    verbose_name='Рецепт'
+                )),
+                ('user', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='feed_entries',
+                    to=settings.AUTH_USER_MODEL,
+                    verbose_name='Читатель'
+                )),
+            ],
+            options={
+                'verbose_name': 'Запись ленты подписок',
+                'verbose_name_plural': 'Записи лент подписок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            ),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
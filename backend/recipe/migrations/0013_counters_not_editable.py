@@ -0,0 +1,27 @@
+# Generated by Django 3.2.13 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0012_feedentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='В избранном'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='В списках покупок'
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.13 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+def mark_pulled_recipes(apps, schema_editor):
+    FeedEntry = apps.get_model('recipe', 'FeedEntry')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Recipe.objects.filter(author__followers_count__gt=0).exclude(
+        id__in=FeedEntry.objects.values('recipe_id')
+    ).update(feed_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0013_counters_not_editable'),
+        ('users', '0005_counters_not_editable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='feed_pulled',
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                verbose_name='Читается в ленту без рассылки'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                condition=models.Q(feed_pulled=True),
+                fields=['author'],
+                name='recipe_feed_pulled_idx'
+            ),
+        ),
+        migrations.RunPython(mark_pulled_recipes, migrations.RunPython.noop),
+    ]
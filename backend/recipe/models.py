@@ -1,8 +1,11 @@
+from collections import Counter
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.core import validators
 from django.core.validators import MinValueValidator
 
+from foodgram.counters import CounterFieldsMixin
 from users.models import User
 
 
@@ -20,6 +23,12 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient'
+            ),
+        )
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -51,7 +60,60 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            false = models.Value(False, output_field=models.BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                FavoriteRecipe.objects.filter(
+                    user=user,
+                    favorite_recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user,
+                    recipe=models.OuterRef('pk')
+                )
+            )
+        )
+
+    def for_read(self, user):
+        return self.with_user_flags(user).prefetch_related(
+            models.Prefetch(
+                'author',
+                queryset=User.objects.with_subscription_flag(user)
+            ),
+            'tags',
+            models.Prefetch(
+                'recipe',
+                queryset=IngredientsInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+
+    def feed(self, user):
+        return self.filter(
+            models.Q(id__in=FeedEntry.objects.filter(
+                user=user
+            ).values('recipe_id'))
+            | models.Q(
+                feed_pulled=True,
+                author_id__in=Subscribe.objects.filter(
+                    user=user
+                ).values('author_id')
+            )
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
 
     tags = models.ManyToManyField(
         Tag,
@@ -89,10 +151,50 @@ class Recipe(models.Model):
         verbose_name='Дата публикации рецепта'
     )
 
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Уменьшенные копии фото'
+    )
+    feed_pulled = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Читается в ленту без рассылки'
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = ('favorites_count', 'in_carts_count')
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-publication_date',)
+        indexes = (
+            models.Index(
+                fields=('-publication_date', '-id'),
+                name='recipe_publication_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=('author',),
+                name='recipe_feed_pulled_idx',
+                condition=models.Q(feed_pulled=True)
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -114,6 +216,12 @@ class ShoppingCart(models.Model):
 
     class Meta:
         verbose_name = 'Список покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_shopping_cart'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user.username}, {self.recipe.name}'
@@ -141,6 +249,12 @@ class IngredientsInRecipe(models.Model):
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_ingredient_in_recipe'
+            ),
+        )
 
     def __str__(self):
         return f'{self.ingredient} в {self.recipe} в кол-ве {self.amount}'
@@ -162,11 +276,36 @@ class FavoriteRecipe(models.Model):
 
     class Meta:
         verbose_name = 'Избранный рецепт'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'favorite_recipe'),
+                name='unique_favorite_recipe'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user} {self.favorite_recipe}'
 
 
+class SubscribeQuerySet(models.QuerySet):
+
+    def with_author_recipes(self, recipes_limit=None):
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=models.Subquery(
+                Recipe.objects.filter(
+                    author=models.OuterRef('author')
+                ).values('pk')[:recipes_limit]
+            ))
+        return self.select_related('author').prefetch_related(
+            models.Prefetch(
+                'author__recipe',
+                queryset=recipes,
+                to_attr='limited_recipes'
+            )
+        )
+
+
 class Subscribe(models.Model):
 
     user = models.ForeignKey(
@@ -186,9 +325,250 @@ class Subscribe(models.Model):
         verbose_name='Дата подписки на автора'
     )
 
+    objects = SubscribeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Подписка на автора'
         verbose_name_plural = 'Подписка на авторов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_subscribe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-follow_date', '-id'),
+                name='subscribe_user_follow_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user.username , self.author.username}'
+
+
+class ShoppingListQuerySet(models.QuerySet):
+
+    def lock_users(self, user_ids):
+        list(User.objects.select_for_update().filter(
+            id__in=user_ids
+        ).order_by('id').values_list('id', flat=True))
+
+    def apply_deltas(self, user_ids, deltas):
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        user_ids = set(user_ids)
+        if not deltas or not user_ids:
+            return
+        with transaction.atomic():
+            self.lock_users(user_ids)
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=0
+                    )
+                    for user_id in user_ids
+                    for ingredient_id, delta in deltas.items() if delta > 0
+                ),
+                ignore_conflicts=True
+            )
+            to_update, to_delete = [], []
+            for item in self.select_for_update().filter(
+                user_id__in=user_ids,
+                ingredient_id__in=deltas
+            ).order_by('user_id', 'ingredient_id'):
+                amount = item.amount + deltas[item.ingredient_id]
+                if amount > 0:
+                    item.amount = amount
+                    to_update.append(item)
+                else:
+                    to_delete.append(item.id)
+            if to_update:
+                self.bulk_update(to_update, ('amount',))
+            if to_delete:
+                self.filter(id__in=to_delete).delete()
+
+    def recipe_amounts(self, recipe_id, sign=1):
+        amounts = Counter()
+        for ingredient_id, amount in IngredientsInRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'):
+            amounts[ingredient_id] += sign * amount
+        return amounts
+
+    def add_recipe(self, user_id, recipe_id):
+        self.apply_deltas((user_id,), self.recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_id, recipe_id):
+        self.apply_deltas((user_id,), self.recipe_amounts(recipe_id, -1))
+
+    def discard_recipe(self, recipe_id):
+        user_ids = list(ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True))
+        self.apply_deltas(user_ids, self.recipe_amounts(recipe_id, -1))
+        return user_ids
+
+    def change_recipe(self, recipe_id, old_amounts, new_amounts):
+        deltas = Counter(new_amounts)
+        deltas.subtract(old_amounts)
+        self.apply_deltas(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('user_id', flat=True),
+            deltas
+        )
+
+    def aggregate_from_carts(self, user_ids=None):
+        carts = ShoppingCart.objects.all()
+        if user_ids is not None:
+            carts = carts.filter(user_id__in=user_ids)
+        return {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in carts.values_list(
+                'user_id',
+                'recipe__recipe__ingredient_id'
+            ).annotate(
+                total=models.Sum('recipe__recipe__amount')
+            ).filter(total__gt=0).order_by()
+        }
+
+    def rebuild(self, user_ids=None):
+        if user_ids is None:
+            user_ids = set(ShoppingCart.objects.values_list(
+                'user_id', flat=True
+            ).distinct()) | set(self.values_list(
+                'user_id', flat=True
+            ).distinct())
+        user_ids = sorted(set(user_ids))
+        batch_size = settings.SHOPPING_LIST_REBUILD_BATCH_SIZE
+        for start in range(0, len(user_ids), batch_size):
+            self.rebuild_users(user_ids[start:start + batch_size])
+        return user_ids
+
+    def rebuild_users(self, user_ids):
+        with transaction.atomic():
+            self.lock_users(user_ids)
+            aggregates = self.aggregate_from_carts(user_ids)
+            self.filter(user_id__in=user_ids).delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount
+                    )
+                    for (user_id, ingredient_id), amount in aggregates.items()
+                ),
+                batch_size=1000
+            )
+
+
+class ShoppingListItem(models.Model):
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_items'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Общее количество'
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
+
+
+class FeedQuerySet(models.QuerySet):
+
+    def is_pulled(self, author_id):
+        return User.objects.filter(
+            id=author_id,
+            followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).exists()
+
+    def fan_out(self, recipe):
+        if self.is_pulled(recipe.author_id):
+            recipe.feed_pulled = True
+            Recipe.objects.filter(id=recipe.id).update(feed_pulled=True)
+            return
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, recipe_id=recipe.id)
+                for user_id in Subscribe.objects.filter(
+                    author_id=recipe.author_id
+                ).values_list('user_id', flat=True).iterator()
+            ),
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+
+    def backfill(self, user_id, author_id):
+        self.bulk_create(
+            (
+                self.model(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in Recipe.objects.filter(
+                    author_id=author_id, feed_pulled=False
+                ).values_list('id', flat=True)[
+                    :settings.FEED_BACKFILL_SIZE
+                ]
+            ),
+            ignore_conflicts=True
+        )
+
+    def prune(self, user_id, author_id):
+        self.filter(user_id=user_id, recipe__author_id=author_id).delete()
+
+
+class FeedEntry(models.Model):
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='feed_entries'
+    )
+
+    objects = FeedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} {self.recipe}'
@@ -0,0 +1,28 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        return os.path.join(directory, f'{digest.hexdigest()}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -1,10 +1,12 @@
 from django.contrib import admin
 
+from foodgram.admin import ScalableAdmin
+
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(ScalableAdmin):
     list_display = (
         'id',
         'username',
@@ -13,10 +15,7 @@ class UserAdmin(admin.ModelAdmin):
         'email',
     )
     search_fields = (
-        'email',
-        'first_name',
-    )
-    list_filter = (
-        'first_name',
-        'email'
+        '^username',
+        '^email',
     )
+    readonly_fields = ('recipes_count', 'followers_count')
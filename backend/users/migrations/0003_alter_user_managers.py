@@ -0,0 +1,21 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:07
+
+from django.db import migrations
+
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auto_20230801_1154'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.FoodgramUserManager()),
+            ],
+        ),
+    ]
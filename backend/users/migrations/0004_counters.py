@@ -0,0 +1,27 @@
+# Generated by Django 3.2.13 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='Количество подписчиков'
+            ),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='Количество рецептов'
+            ),
+        ),
+    ]
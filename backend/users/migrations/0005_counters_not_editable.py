@@ -0,0 +1,31 @@
+# Generated by Django 3.2.13 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name='Количество подписчиков'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name='Количество рецептов'
+            ),
+        ),
+    ]
@@ -1,10 +1,33 @@
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core import validators
 from django.db import models
 
+from foodgram.counters import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class UserQuerySet(models.QuerySet):
+
+    def with_subscription_flag(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_subscribed=models.Value(
+                    False,
+                    output_field=models.BooleanField()
+                )
+            )
+        return self.annotate(
+            is_subscribed=models.Exists(
+                user.follower.filter(author=models.OuterRef('pk'))
+            )
+        )
+
+
+class FoodgramUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+class User(CounterFieldsMixin, AbstractUser):
 
     email = models.EmailField(
         max_length=settings.LENGTH_EMAIL,
@@ -26,6 +49,21 @@ class User(AbstractUser):
         verbose_name='Фамилия'
     )
 
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+
+    objects = FoodgramUserManager()
+
+    counter_fields = ('recipes_count', 'followers_count')
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'